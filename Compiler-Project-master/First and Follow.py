@@ -1,4 +1,4 @@
-from compiler import parse_tree
+import compiler
 
 
 def extract_symbols(grammar):
@@ -93,7 +93,8 @@ def compute_follow(grammar, first_sets):
 
 
 # Example JSON-like grammar structure
-grammar = parse_tree 
+compiler.compile()
+grammar = compiler.parse_tree
 
 # Compute FIRST and FOLLOW sets
 first_sets = compute_first(grammar)
@@ -1,4 +1,6 @@
 import re
+import sys
+import time
 
 token_rules = [
     ('NUMBER', r'\d+'),
@@ -377,8 +379,397 @@ def parser(tokens_list):
     return program()
 
 
+# ----------------------------------------[Three-Address Code IR]----------------------------------------
+#
+# Program      -> {"Units", "Globals"}
+# Unit         -> {"Name", "Parameters", "Variables", "Declarations", "Temporaries", "Blocks", "Reads", "Calls",
+#                  "Outer Reads"}
+# Block        -> {"Label", "Instructions", "Successors", "Predecessors"}
+# Instruction  -> {"Op", "Dest", "Args"} (+ "Compare", "Targets", "Function", "Reads")
+#
+# Operands are plain strings: variable names, temporaries ("%t0", "%t1", ...),
+# number literals and quoted string literals. Every block ends with exactly one
+# terminator: "branch", "goto" or "return".
+#
+# The symbol table is a single flat scope, so a variable read by a unit that
+# does not declare it is shared program-wide. Those variables live in global
+# slots ("Globals"); everything else lives in the frame slots of its own unit.
+# Parameters are never in the symbol table, so they stay in the frame unless
+# the unit also declares them with "be", which makes the name program-wide.
+
+TERMINATORS = ("branch", "goto", "return")
+
+def is_storage_operand(operand):
+    return operand[0] == "%" or operand[0] == "_" or operand[0].isalpha()
+
+def lower(ast):
+    units = []
+
+    def lower_unit(name, params, body):
+        unit = {"Name": name, "Parameters": list(params), "Variables": [], "Declarations": [], "Temporaries": 0,
+                "Blocks": [], "Reads": [], "Calls": []}
+        units.append(unit)
+        blocks = unit["Blocks"]
+        created = []
+        declared = set()
+        current = None
+
+        def new_block():
+            block = {"Label": f"L{len(created)}", "Instructions": [], "Successors": [], "Predecessors": []}
+            created.append(block)
+            return block
+
+        def start(block):
+            nonlocal current
+            blocks.append(block)
+            current = block
+
+        def emit(op, dest=None, args=(), **extra):
+            nonlocal current
+            instruction = {"Op": op, "Dest": dest, "Args": list(args), **extra}
+            current["Instructions"].append(instruction)
+            if op in TERMINATORS:
+                current = None
+            return instruction
+
+        def declare(variable):
+            if variable not in declared:
+                declared.add(variable)
+                unit["Variables"].append(variable)
+
+        def new_temp():
+            temp = f"%t{unit['Temporaries']}"
+            unit["Temporaries"] += 1
+            return temp
+
+        def operand(expr):
+            if expr["Type"] == "Identifier":
+                return expr.get("Name", expr.get("Value"))
+            elif expr["Type"] in ("Number", "String Expression"):
+                return expr["Value"]
+            elif expr["Type"] == "Number Expression":
+                left = operand(expr["Left"])
+                right = operand(expr["Right"])
+                temp = new_temp()
+                emit(expr["Operator"], temp, [left, right])
+                return temp
+            raise SyntaxError(f"Cannot lower expression: {expr}")
+
+        def branch(cond, true_block, false_block):
+            left = operand(cond["Left"])
+            right = operand(cond["Right"])
+            emit("branch", args=[left, right], Compare=cond["Comparing Operator"],
+                 Targets=[true_block["Label"], false_block["Label"]])
+
+        def statements(body):
+            for node in body:
+                statement(node)
+
+        def statement(node):
+            if node["Type"] == "VariableDeclaration":
+                declare(node["Identifier"])
+                unit["Declarations"].append(node["Identifier"])
+                value = node["Value"]
+                if value["Type"] == "Number Expression":
+                    # Write the last operation straight into the variable instead of through a temporary
+                    left = operand(value["Left"])
+                    right = operand(value["Right"])
+                    emit(value["Operator"], node["Identifier"], [left, right])
+                else:
+                    emit("=", node["Identifier"], [operand(value)])
+
+            elif node["Type"] == "If Statement":
+                end = new_block()
+                arms = [(node["Condition"], node["Body"])]
+                if node["Elif Statement"]:
+                    arms.append((node["Elif Statement"]["Condition"], node["Elif Statement"]["Body"]))
+                for cond, body in arms:
+                    then_block = new_block()
+                    next_block = new_block()
+                    branch(cond, then_block, next_block)
+                    start(then_block)
+                    statements(body)
+                    emit("goto", Targets=[end["Label"]])
+                    start(next_block)
+                if node["Else Statement"]:
+                    statements(node["Else Statement"]["Body"])
+                emit("goto", Targets=[end["Label"]])
+                start(end)
+
+            elif node["Type"] == "While Loop":
+                header = new_block()
+                loop_body = new_block()
+                exit_block = new_block()
+                emit("goto", Targets=[header["Label"]])
+                start(header)
+                branch(node["Condition"], loop_body, exit_block)
+                start(loop_body)
+                statements(node["Body"])
+                emit("goto", Targets=[header["Label"]])
+                start(exit_block)
+
+            elif node["Type"] == "Function Declaration":
+                lower_unit(node["Identifier"], node.get("Parameters", []), node["Body"])
+
+            elif node["Type"] == "Function Call":
+                args = [operand(arg) for arg in node.get("Arguments", [])]
+                emit("call", args=args, Function=node["Identifier"])
+
+            elif node["Type"] == "Print Statement":
+                emit("show", args=[operand(expr) for expr in node["Expressions"]])
 
-def compile():
+            else:
+                raise SyntaxError(f"Cannot lower statement: {node['Type']}")
+
+        start(new_block())
+        for param in params:
+            declare(param)
+            emit("param", param)
+        statements(body)
+        emit("return")
+
+        # Blocks are created before their position is known, so number them in layout order at the end
+        relabel = {block["Label"]: f"B{index}" for index, block in enumerate(blocks)}
+        for block in blocks:
+            block["Label"] = relabel[block["Label"]]
+            terminator = block["Instructions"][-1]
+            if "Targets" in terminator:
+                terminator["Targets"] = [relabel[target] for target in terminator["Targets"]]
+        labels = {block["Label"]: block for block in blocks}
+        for block in blocks:
+            block["Successors"] = list(block["Instructions"][-1].get("Targets", []))
+            for successor in block["Successors"]:
+                labels[successor]["Predecessors"].append(block["Label"])
+
+        # Dicts keep first-seen order with constant-time membership checks
+        reads, calls = {}, {}
+        for block in blocks:
+            for instruction in block["Instructions"]:
+                for arg in instruction["Args"]:
+                    if is_storage_operand(arg) and arg[0] != "%":
+                        reads[arg] = None
+                if instruction["Op"] == "call":
+                    calls[instruction["Function"]] = None
+        unit["Reads"], unit["Calls"] = list(reads), list(calls)
+        return unit
+
+    # Function names are unique in the flat symbol table; "<main>" is not a valid identifier, so it cannot clash
+    lower_unit("<main>", [], ast["Body"])
+    resolve_outer_reads(units)
+    return {"Units": units, "Globals": {}}
+
+def resolve_outer_reads(units):
+    # Outer Reads(U) = (Reads(U) - Variables(U)) U (Outer Reads(C) - Declarations(U)) for every C called by U
+    by_name = {unit["Name"]: unit for unit in units}
+    outer_reads, declarations = {}, {}
+    for unit in units:
+        declared = set(unit["Variables"])
+        outer_reads[unit["Name"]] = {name: None for name in unit["Reads"] if name not in declared}
+        declarations[unit["Name"]] = set(unit["Declarations"])
+
+    changed = True
+    while changed:
+        changed = False
+        for unit in units:
+            reads = outer_reads[unit["Name"]]
+            for callee in unit["Calls"]:
+                for name in list(outer_reads.get(callee, ())):
+                    if name not in reads and name not in declarations[unit["Name"]]:
+                        reads[name] = None
+                        changed = True
+
+    for unit in units:
+        unit["Outer Reads"] = list(outer_reads[unit["Name"]])
+
+    for unit in units:
+        for block in unit["Blocks"]:
+            for instruction in block["Instructions"]:
+                if instruction["Op"] == "call":
+                    callee = by_name.get(instruction["Function"])
+                    instruction["Reads"] = list(callee["Outer Reads"]) if callee else []
+
+def is_frame_local(name, unit, global_slots):
+    if name[0] == "%" or name not in global_slots:
+        return True
+    return name in unit["Parameters"] and name not in unit["Declarations"]
+
+def instruction_uses(instruction):
+    # A call also reads every shared variable the callee reads, directly or through its own calls
+    return [arg for arg in instruction["Args"] if is_storage_operand(arg)] + instruction.get("Reads", [])
+
+def instruction_defs(instruction):
+    return [instruction["Dest"]] if instruction["Dest"] else []
+
+#Liveness: Live Out(B) = U Live In(S) for S in Successors(B)
+#          Live In(B)  = Use(B) U (Live Out(B) - Def(B))
+def liveness(unit):
+    blocks = {block["Label"]: block for block in unit["Blocks"]}
+    for block in unit["Blocks"]:
+        use, define = set(), set()
+        for instruction in block["Instructions"]:
+            use.update(name for name in instruction_uses(instruction) if name not in define)
+            define.update(instruction_defs(instruction))
+        block["Use"], block["Def"] = use, define
+        block["Live In"], block["Live Out"] = set(), set()
+
+    iterations = 0
+    changed = True
+    while changed:
+        changed = False
+        iterations += 1
+        for block in reversed(unit["Blocks"]):
+            live_out = set()
+            for successor in block["Successors"]:
+                live_out |= blocks[successor]["Live In"]
+            live_in = block["Use"] | (live_out - block["Def"])
+            if live_in != block["Live In"] or live_out != block["Live Out"]:
+                block["Live In"], block["Live Out"] = live_in, live_out
+                changed = True
+    return iterations
+
+def allocate_globals(program):
+    global_slots = {}
+    for unit in program["Units"]:
+        declared = set(unit["Variables"])
+        for name in unit["Reads"]:
+            if name not in declared and name not in global_slots:
+                global_slots[name] = len(global_slots)
+    program["Globals"] = global_slots
+    return global_slots
+
+def allocate_slots(unit, global_slots):
+    interference = {}
+    for block in unit["Blocks"]:
+        for instruction in block["Instructions"]:
+            for name in instruction_defs(instruction):
+                if is_frame_local(name, unit, global_slots) and name not in interference:
+                    interference[name] = set()
+
+    def interfere(a, b):
+        if a != b and a in interference and b in interference:
+            interference[a].add(b)
+            interference[b].add(a)
+
+    for block in unit["Blocks"]:
+        live = set(block["Live Out"])
+        for instruction in reversed(block["Instructions"]):
+            defs = instruction_defs(instruction)
+            for name in defs:
+                for other in live:
+                    interfere(name, other)
+            live -= set(defs)
+            live.update(instruction_uses(instruction))
+
+    # Arguments are written into every parameter slot at once
+    for a in unit["Parameters"]:
+        for b in unit["Parameters"]:
+            interfere(a, b)
+
+    slots = {}
+    for name in interference:
+        taken = {slots[other] for other in interference[name] if other in slots}
+        slot = 0
+        while slot in taken:
+            slot += 1
+        slots[name] = slot
+    unit["Slots"] = slots
+    unit["Frame Size"] = max(slots.values()) + 1 if slots else 0
+    return slots
+
+def format_operand(operand, slots=None, global_slots=None):
+    if slots is not None and operand in slots:
+        return f"[{slots[operand]}]"
+    if global_slots is not None and operand in global_slots:
+        return f"[g{global_slots[operand]}]"
+    return operand
+
+def format_instruction(instruction, slots=None, global_slots=None):
+    def fmt(operand):
+        return format_operand(operand, slots, global_slots)
+
+    op, dest, args = instruction["Op"], instruction["Dest"], [fmt(arg) for arg in instruction["Args"]]
+    if op == "=":
+        return f"{fmt(dest)} = {args[0]}"
+    elif op == "param":
+        return f"param {fmt(dest)}"
+    elif op == "branch":
+        return f"if {args[0]} {instruction['Compare']} {args[1]} goto {instruction['Targets'][0]} else {instruction['Targets'][1]}"
+    elif op == "goto":
+        return f"goto {instruction['Targets'][0]}"
+    elif op == "return":
+        return "return"
+    elif op == "show":
+        return f"show {', '.join(args)}"
+    elif op == "call":
+        return f"call {instruction['Function']}({', '.join(args)})"
+    return f"{fmt(dest)} = {args[0]} {op} {args[1]}"
+
+# slots=False prints the IR as lowered; slots=True adds live-in sets and prints every name as its slot
+def print_ir(program, slots=False):
+    global_slots = program["Globals"] if slots else None
+    for unit in program["Units"]:
+        unit_slots = unit["Slots"] if slots else None
+        print(f"\n{unit['Name']}({', '.join(unit['Parameters'])}):")
+        for block in unit["Blocks"]:
+            predecessors = ", ".join(block["Predecessors"]) or "-"
+            print(f"  {block['Label']}:    ; preds: {predecessors}")
+            if slots:
+                live_in = sorted((format_operand(name, unit_slots, global_slots) for name in block["Live In"]),
+                                 key=lambda slot: (len(slot), slot))
+                print(f"    ; live in: {', '.join(live_in) or '-'}")
+            for instruction in block["Instructions"]:
+                print(f"    {format_instruction(instruction, unit_slots, global_slots)}")
+        if slots:
+            print(f"  ; slots: {unit['Slots']}")
+    if slots:
+        print(f"\nglobals: {program['Globals']}")
+
+def print_storage_summary(program):
+    print("\nStorage:")
+    global_slots = program["Globals"]
+    total_before = total_after = 0
+    for unit in program["Units"]:
+        variables = [name for name in unit["Variables"] if is_frame_local(name, unit, global_slots)]
+        before = len(variables) + unit["Temporaries"]
+        after = unit["Frame Size"]
+        total_before += before
+        total_after += after
+        print(f"  [{unit['Name']}] {len(variables)} variables + {unit['Temporaries']} temporaries "
+              f"-> {after} slots (saved {before - after})")
+    print(f"  [globals] {len(global_slots)} shared variables -> {len(global_slots)} slots")
+    total_before += len(global_slots)
+    total_after += len(global_slots)
+    print(f"  Total: {total_before} -> {total_after} slots (saved {total_before - total_after})")
+
+def run_ir_passes(ast):
+    timings = {}
+
+    start = time.perf_counter()
+    program = lower(ast)
+    timings["Lowering"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for unit in program["Units"]:
+        unit["Liveness Iterations"] = liveness(unit)
+    timings["Liveness"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    global_slots = allocate_globals(program)
+    for unit in program["Units"]:
+        allocate_slots(unit, global_slots)
+    timings["Slot Allocation"] = time.perf_counter() - start
+
+    return program, timings
+
+def print_timings(program, timings):
+    print("\nPass Timings:")
+    for name, seconds in timings.items():
+        print(f"  {name}: {seconds * 1000:.3f} ms")
+    iterations = ", ".join(f"{unit['Name']}={unit['Liveness Iterations']}" for unit in program["Units"])
+    print(f"  Liveness Iterations: {iterations}")
+
+
+def compile(dump_ir=False):
     try:
         # Open source code
         global parse_tree
@@ -407,6 +798,19 @@ def compile():
         print("\n")
         print("-"*160)
 
+        # Lowering to three-address code
+        # Full IR dumps are large on generated programs, so only print them with --dump-ir
+        ir_program, timings = run_ir_passes(parse_tree)
+        if dump_ir:
+            print("\nThree-Address Code:")
+            print_ir(ir_program)
+            print("\nAfter Liveness and Slot Allocation:")
+            print_ir(ir_program, slots=True)
+        print_storage_summary(ir_program)
+        print_timings(ir_program, timings)
+        print("\n")
+        print("-"*160)
+
     except SyntaxError as e:
         print(f"Syntax Error: {e}")
     except ValueError as e:
@@ -415,5 +819,5 @@ def compile():
         print(f"Unexpected Error: {e}")
 
 
-compile()
-
+if __name__ == "__main__":
+    compile(dump_ir="--dump-ir" in sys.argv)
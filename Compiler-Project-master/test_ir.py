@@ -0,0 +1,147 @@
+import compiler
+
+
+def build(code):
+    compiler.symbol_table[:] = [{}]
+    program, _ = compiler.run_ir_passes(compiler.parser(compiler.lexer(code)))
+    return program
+
+def get_unit(program, name):
+    return next(unit for unit in program["Units"] if unit["Name"] == name)
+
+def get_block(unit, label):
+    return next(block for block in unit["Blocks"] if block["Label"] == label)
+
+def assert_no_shared_live_slots(program):
+    # Walk every block backwards and check that a definition never takes the slot of another live name
+    global_slots = program["Globals"]
+    for unit in program["Units"]:
+        slots = unit["Slots"]
+        for block in unit["Blocks"]:
+            live = set(block["Live Out"])
+            for instruction in reversed(block["Instructions"]):
+                for name in compiler.instruction_defs(instruction):
+                    if name not in slots:
+                        assert name in global_slots
+                        continue
+                    for other in live:
+                        if other != name and other in slots:
+                            assert slots[other] != slots[name], (unit["Name"], name, other)
+                live -= set(compiler.instruction_defs(instruction))
+                live.update(compiler.instruction_uses(instruction))
+
+
+def test_check_alsocheck_other_join_in_one_block():
+    program = build("x be (1);\n"
+                    "check (x > 0) { show(1); } alsocheck (x == 0) { show(2); } other { show(3); }\n"
+                    "show(x);")
+    main = get_unit(program, "<main>")
+    entry = main["Blocks"][0]
+    assert entry["Instructions"][-1]["Op"] == "branch"
+    then_block, elif_check = (get_block(main, label) for label in entry["Successors"])
+    assert elif_check["Instructions"][-1]["Op"] == "branch"
+    elif_body, else_body = (get_block(main, label) for label in elif_check["Successors"])
+
+    end = get_block(main, then_block["Successors"][0])
+    assert elif_body["Successors"] == [end["Label"]]
+    assert else_body["Successors"] == [end["Label"]]
+    assert sorted(end["Predecessors"]) == sorted([then_block["Label"], elif_body["Label"], else_body["Label"]])
+    assert end["Instructions"][-1]["Op"] == "return"
+
+def test_check_without_other_falls_through_to_end():
+    program = build("x be (1);\ncheck (x > 0) { show(1); }\nshow(x);")
+    main = get_unit(program, "<main>")
+    entry = main["Blocks"][0]
+    then_block, skip_block = (get_block(main, label) for label in entry["Successors"])
+    assert then_block["Successors"] == skip_block["Successors"]
+    assert len(get_block(main, then_block["Successors"][0])["Predecessors"]) == 2
+
+def test_repeat_has_back_edge_to_header():
+    program = build("i be (0);\nrepeat (i < 5) { show(i); }\nshow(1);")
+    main = get_unit(program, "<main>")
+    entry = main["Blocks"][0]
+    header = get_block(main, entry["Successors"][0])
+    body, exit_block = (get_block(main, label) for label in header["Successors"])
+    assert body["Successors"] == [header["Label"]]
+    assert sorted(header["Predecessors"]) == sorted([entry["Label"], body["Label"]])
+    assert exit_block["Predecessors"] == [header["Label"]]
+
+def test_loop_variable_is_live_around_the_loop():
+    program = build("i be (0);\nrepeat (i < 5) { show(i); }\nshow(1);")
+    main = get_unit(program, "<main>")
+    entry = main["Blocks"][0]
+    header = get_block(main, entry["Successors"][0])
+    body, exit_block = (get_block(main, label) for label in header["Successors"])
+    assert entry["Live In"] == set()
+    assert header["Live In"] == {"i"}
+    assert body["Live Out"] == {"i"}
+    assert exit_block["Live In"] == set()
+
+def test_variables_with_disjoint_lifetimes_share_a_slot():
+    program = build("a be (1);\nshow(a);\nb be (2);\nshow(b);")
+    main = get_unit(program, "<main>")
+    assert main["Slots"] == {"a": 0, "b": 0}
+    assert main["Frame Size"] == 1
+
+def test_live_variables_never_share_a_slot():
+    lines = []
+    for i in range(30):
+        lines.append(f"a{i} be ({i} + 1 * 2);")
+        if i == 0:
+            lines.append("make f (p, q) { t be (1 + a0); show(t); }")
+        lines.append(f"check (a{i} > 3) {{ b{i} be (1 + a{i}); show(b{i}); }} other {{ show(a{i}); }}")
+        lines.append(f"repeat (a{i} < 10) {{ c{i} be (10 - a{i}); show(c{i}); }}")
+        if i % 5 == 0:
+            lines.append(f"deliver f (a{i}, 1);")
+    program = build("\n".join(lines))
+    assert_no_shared_live_slots(program)
+    assert program["Globals"] == {"a0": 0}
+    assert get_unit(program, "<main>")["Frame Size"] < 30
+
+def test_call_only_keeps_what_the_callee_reads_alive():
+    lines = ["make f { show(1); }"]
+    for i in range(200):
+        lines.append(f"a{i} be ({i});")
+        if i % 20 == 0:
+            lines.append("deliver f;")
+    program = build("\n".join(lines))
+    assert get_unit(program, "<main>")["Frame Size"] == 1
+    assert program["Globals"] == {}
+
+def test_variables_read_across_units_get_global_slots():
+    program = build("x be (5);\nmake f { show(x); k be (2); }\ndeliver f;\nshow(k);")
+    main, f = get_unit(program, "<main>"), get_unit(program, "f")
+    assert set(program["Globals"]) == {"x", "k"}
+    assert main["Slots"] == {} and f["Slots"] == {}
+    show_x = f["Blocks"][0]["Instructions"][0]
+    assert compiler.format_instruction(show_x, f["Slots"], program["Globals"]) == f"show [g{program['Globals']['x']}]"
+    assert_no_shared_live_slots(program)
+
+def test_outer_reads_follow_calls_transitively():
+    program = build("x be (1);\nmake g { show(x); }\nmake f { deliver g; }\ndeliver f;")
+    assert get_unit(program, "f")["Outer Reads"] == ["x"]
+    call_f = get_unit(program, "<main>")["Blocks"][0]["Instructions"][-2]
+    assert call_f["Op"] == "call" and call_f["Reads"] == ["x"]
+
+def test_parameters_stay_in_the_frame():
+    program = build("x be (1);\nmake f (x) { show(x); }\ndeliver f (x);")
+    assert program["Globals"] == {}
+    assert get_unit(program, "f")["Slots"] == {"x": 0}
+
+def test_parameter_redeclared_with_be_uses_its_global_slot():
+    program = build("make f (p) { p be (1); }\ndeliver f (2);\nshow(p);")
+    main, f = get_unit(program, "<main>"), get_unit(program, "f")
+    assert program["Globals"] == {"p": 0}
+    assert f["Slots"] == {}
+    writes = [compiler.format_instruction(instruction, f["Slots"], program["Globals"])
+              for instruction in f["Blocks"][0]["Instructions"]]
+    assert writes == ["param [g0]", "[g0] = 1", "return"]
+    assert compiler.format_instruction(main["Blocks"][0]["Instructions"][1], main["Slots"], program["Globals"]) == "show [g0]"
+
+def test_user_function_named_main_does_not_clash_with_top_level():
+    program = build("x be (1);\nmake main { show(x); }\ndeliver main;")
+    assert [unit["Name"] for unit in program["Units"]] == ["<main>", "main"]
+    assert get_unit(program, "<main>")["Outer Reads"] == []
+    assert get_unit(program, "main")["Outer Reads"] == ["x"]
+    assert get_unit(program, "<main>")["Blocks"][0]["Instructions"][-2]["Reads"] == ["x"]
+    assert program["Globals"] == {"x": 0}